@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, multi-process mode is unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS_SUPPORTED = fcntl is not None
+
+
+class DataFileCoordinator:
+    """Cross-process coordination for the shared JSON data file.
+
+    Writers hold an exclusive flock on a sidecar ``.lock`` file and
+    readers a shared one. Each process compares the signature of the
+    watched files before touching its in-memory copy, so a write made by
+    another worker invalidates the local cache and triggers a reload.
+    """
+
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.lock_file = f"{data_file}.lock"
+        self.watched: List[str] = [data_file]
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._exclusive = False
+
+    def watch(self, path: str):
+        """Also treat changes to ``path`` as a change of the shared data."""
+        if path not in self.watched:
+            self.watched.append(path)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def signature(self) -> tuple:
+        return tuple(self._stat(path) for path in self.watched)
+
+    def acquire(self, exclusive: bool):
+        """Take the file lock; re-entrant within the owning thread."""
+        if self._depth == 0:
+            self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._exclusive = exclusive
+        elif exclusive and not self._exclusive:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._exclusive = True
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+            self._exclusive = False
+
+
+class LeaderElection:
+    """Elects one process to run background engines.
+
+    The leader holds a non-blocking exclusive flock on ``path`` for its
+    whole lifetime; followers retry periodically so leadership moves to a
+    surviving worker when the leader exits.
+    """
+
+    def __init__(self, path: str, retry_interval: float = 5.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._leader_tasks: List[asyncio.Task] = []
+        self.engines: List[Callable[[], Awaitable[None]]] = []
+
+    def register(self, engine: Callable[[], Awaitable[None]]):
+        """Register a coroutine function that must run in exactly one process."""
+        self.engines.append(engine)
+        return engine
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_interval)
+        logger.info("Process %s elected leader", os.getpid())
+        loop = asyncio.get_running_loop()
+        self._leader_tasks = [loop.create_task(engine()) for engine in self.engines]
+
+    async def stop(self):
+        tasks = self._leader_tasks + ([self._task] if self._task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._leader_tasks = []
+        self._task = None
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
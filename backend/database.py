@@ -1,63 +1,454 @@
+import asyncio
+import contextvars
+import functools
 import json
+import logging
+import multiprocessing
 import os
-from typing import Dict, List, Optional
+import pickle
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
-from .models import User, WhatsAppInstance, Conversation, Campaign
+from .models import User, WhatsAppInstance, Conversation, Campaign, Message
+from .messages import MessageStore, format_time
+from .serialization import encode_payload_bytes
+from .coordination import DataFileCoordinator, MULTIPROCESS_SUPPORTED
+from .indexes import CollectionIndex, Page, sort_key
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Concurrency limits for the async facade (overridable via environment)
+DB_THREADS = _env_int('WHATSAPP_BOT_DB_THREADS', 4)
+DB_PROCESSES = _env_int('WHATSAPP_BOT_DB_PROCESSES', 1)
+# Payloads at least this large (bytes) are encoded in the process pool
+DB_OFFLOAD_BYTES = _env_int('WHATSAPP_BOT_DB_OFFLOAD_BYTES', 4 * 1024 * 1024)
+# Number of server processes sharing the data file (set by main.py --workers)
+WORKERS = _env_int('WHATSAPP_BOT_WORKERS', 1)
+# Journaled field updates kept before they are folded into a full save
+JOURNAL_COMPACT_ENTRIES = _env_int('WHATSAPP_BOT_JOURNAL_ENTRIES', 10000)
+
+
+def _locked(exclusive: bool):
+    """Run a database method under the instance lock and, when several
+    processes share the data file, the matching cross-process file lock."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._lock:
+                if self.coordinator is None:
+                    return method(self, *args, **kwargs)
+                self.coordinator.acquire(exclusive)
+                try:
+                    self._refresh()
+                    return method(self, *args, **kwargs)
+                finally:
+                    self.coordinator.release()
+        return wrapper
+    return decorator
+
+
+_reader = _locked(exclusive=False)
+_writer = _locked(exclusive=True)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _conversation_row(conversation: Conversation) -> Dict:
+    """Stored form of a conversation: messages kept in a MessageStore."""
+    row = conversation.model_dump(exclude={"messages"})
+    row["messages"] = MessageStore.from_records(conversation.messages, conversation.updated_at)
+    return row
+
+
+def _conversation_model(row: Dict, with_messages: bool = True) -> Conversation:
+    messages = [Message(**message) for message in row["messages"]] if with_messages else []
+    return Conversation(**{**row, "messages": messages})
+
 
 class SimpleDatabase:
-    def __init__(self, data_file: str = "whatsapp_bot_data.json"):
+    def __init__(self, data_file: str = "whatsapp_bot_data.json",
+                 coordinator: Optional[DataFileCoordinator] = None):
         self.data_file = data_file
+        self.coordinator = coordinator
+        self._lock = threading.RLock()
+        # Optional executor used to encode large payloads off the calling thread
+        self.encode_executor: Optional[Executor] = None
+        self.offload_threshold = DB_OFFLOAD_BYTES
+        self._last_payload_size = 0
+        # Small field updates (unread counters) are appended here instead of
+        # rewriting the whole data file; replayed on load, cleared on save.
+        # Entries carry a sequence number; the data file records the last
+        # one it includes as ``journal_seq``.
+        self.journal_file = f"{data_file}.journal"
+        self._journal_entries = 0
+        # Bytes of the journal already applied to ``data``
+        self._journal_offset = 0
+        if coordinator is not None:
+            coordinator.watch(self.journal_file)
+        # Bumped whenever the in-memory data is replaced by a reload
+        self.generation = 0
+        self._signature = coordinator.signature() if coordinator else None
+        # Binary copy of the data file, loaded instead of parsing the JSON
+        self.snapshot_file = f"{data_file}.snapshot"
+        self._snapshot_signature: Optional[tuple] = None
+        self.load_stats: Dict[str, Any] = {}
         self.data = self._load_data()
+        # Secondary indexes per (collection, owner), built on first query
+        self._indexes: Dict[tuple, CollectionIndex] = {}
+        # Cached unread totals per user, kept in sync by every write
+        self._unread_totals: Dict[str, int] = {}
+        self._derived_generation = self.generation
+        if self.load_stats["signature"] is not None:
+            self._last_payload_size = self.load_stats["signature"][2]
     
+    def _json_signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        # Every save replaces the file, so the inode changes even when two
+        # same-size saves land within one mtime tick
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load_snapshot(self, signature: tuple) -> Optional[Dict]:
+        # Unpickling runs arbitrary code, so only a file this process could
+        # have written itself is trusted: same owner, not writable by others
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if (hasattr(os, "getuid") and st.st_uid != os.getuid()) or st.st_mode & 0o022:
+                    logger.warning("Ignoring snapshot %s: not owned by this user or writable by others",
+                                   self.snapshot_file)
+                    return None
+                if pickle.load(f) != signature:
+                    return None
+                data = pickle.load(f)
+        except Exception:
+            return None
+        self._snapshot_signature = signature
+        return data
+
+    def _write_snapshot(self, signature: tuple, data: Dict):
+        tmp_file = f"{self.snapshot_file}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'wb') as f:
+                pickle.dump(signature, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.snapshot_file)
+        except OSError as e:
+            logger.warning("Could not write data snapshot: %s", e)
+            return
+        self._snapshot_signature = signature
+
     def _load_data(self) -> Dict:
-        if os.path.exists(self.data_file):
+        started = time.perf_counter()
+        signature = self._json_signature()
+        data, source = self._read_data_file(signature)
+        self._compact_messages(data)
+        self._journal_offset = 0
+        self._journal_entries = self._replay_journal(data)
+        self.load_stats = {
+            "source": source,
+            "seconds": time.perf_counter() - started,
+            "signature": signature,
+        }
+        logger.info("Loaded data from %s in %.1f ms", source, self.load_stats["seconds"] * 1000)
+        return data
+
+    def _read_data_file(self, signature: Optional[tuple]):
+        if signature is not None:
+            data = self._load_snapshot(signature)
+            if data is not None:
+                return data, "snapshot"
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    return json.load(f), "json"
             except:
                 pass
         return {
             "users": [],
             "conversations": {},  # {user_id: [conversations]}
             "campaigns": {}  # {user_id: [campaigns]}
-        }
+        }, "empty"
+
+    @staticmethod
+    def _compact_messages(data: Dict):
+        """Move message lists read from JSON into columnar MessageStores."""
+        for conversations in data["conversations"].values():
+            for conv in conversations:
+                messages = conv.get("messages")
+                if not isinstance(messages, MessageStore):
+                    conv["messages"] = MessageStore.from_records(
+                        messages or [], _parse_datetime(conv.get("updated_at"))
+                    )
+
+    def _replay_journal(self, data: Dict, live: bool = False) -> int:
+        """Apply journal entries past ``_journal_offset``; returns how many were read.
+
+        Entries up to the data's ``journal_seq`` are already part of it (a
+        crash between the save and the journal truncate leaves them behind)
+        and are skipped. ``live`` also updates indexes and unread totals.
+        """
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._journal_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return 0
+        # Stop at the last complete line; the next append terminates a torn one
+        end = chunk.rfind(b"\n") + 1
+        self._journal_offset += end
+        rows: Dict[str, Dict[str, Dict]] = {}
+        count = 0
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash
+            count += 1
+            seq = entry.get("seq")
+            if seq is not None:
+                if seq <= data.get("journal_seq", 0):
+                    continue
+                data["journal_seq"] = seq
+            user_id, fields = entry["user_id"], entry["fields"]
+            if live:
+                row = self._collection_index("conversations", user_id).rows.get(entry["conversation_id"])
+                if row is not None:
+                    self._apply_conversation_fields(user_id, row, fields)
+                continue
+            if user_id not in rows:
+                rows[user_id] = {
+                    conv["id"]: conv for conv in data["conversations"].get(user_id, [])
+                }
+            row = rows[user_id].get(entry["conversation_id"])
+            if row is not None:
+                row.update(fields)
+        return count
+
+    def _append_journal(self, user_id: str, conversation_id: str, fields: Dict[str, Any]):
+        seq = self.data["journal_seq"] = self.data.get("journal_seq", 0) + 1
+        entry = {"seq": seq, "user_id": user_id, "conversation_id": conversation_id, "fields": fields}
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with open(self.journal_file, 'a+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line  # keep a torn line from swallowing this entry
+            f.write(line)
+            self._journal_offset = f.tell()
+        self._journal_entries += 1
+        if self._journal_entries >= JOURNAL_COMPACT_ENTRIES:
+            self._save_data()
+        elif self.coordinator is not None:
+            self._signature = self.coordinator.signature()
+
+    @_reader
+    def save_snapshot(self) -> bool:
+        """Refresh the binary snapshot so the next start skips JSON parsing.
+
+        Does nothing when the snapshot already matches the data file.
+        """
+        signature = self._json_signature()
+        if signature is None or signature == self._snapshot_signature:
+            return False
+        self._write_snapshot(signature, self.data)
+        return True
     
+    def _refresh(self):
+        """Catch up with writes made by other processes.
+
+        When only the journal grew, just its new entries are applied;
+        any other change reloads the data file.
+        """
+        signature = self.coordinator.signature()
+        if signature == self._signature:
+            return
+        (data_stat, journal_stat), (old_data_stat, old_journal_stat) = signature, self._signature
+        if (data_stat == old_data_stat and journal_stat is not None
+                and (old_journal_stat is None or journal_stat[0] == old_journal_stat[0])
+                and journal_stat[2] >= self._journal_offset):
+            self._journal_entries += self._replay_journal(self.data, live=True)
+        else:
+            self.data = self._load_data()
+            self.generation += 1
+        self._signature = signature
+
+    def _encode_data(self) -> bytes:
+        with span("db.encode"):
+            return self._encode_payload()
+
+    def _encode_payload(self) -> bytes:
+        if self.encode_executor is not None and self._last_payload_size >= self.offload_threshold:
+            # The lock is held until the worker returns, so the data cannot
+            # change while it is being pickled for the child process.
+            payload = self.encode_executor.submit(encode_payload_bytes, self.data).result()
+        else:
+            payload = encode_payload_bytes(self.data)
+        self._last_payload_size = len(payload)
+        return payload
+
     def _save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False, default=str)
+        payload = self._encode_data()
+        with span("db.commit"):
+            self._write_data_file(payload)
+
+    def _write_data_file(self, payload: bytes):
+        tmp_file = f"{self.data_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_file, self.data_file)
+        if self._journal_entries or self.coordinator is not None:
+            # The data file now holds every journaled update
+            try:
+                os.truncate(self.journal_file, 0)
+            except FileNotFoundError:
+                pass
+            self._journal_entries = 0
+            self._journal_offset = 0
+        if self.coordinator is not None:
+            self._signature = self.coordinator.signature()
     
+    # Secondary indexes and cached totals
+    def _check_generation(self):
+        if self._derived_generation != self.generation:
+            # Data was reloaded from disk; every derived structure is stale
+            self._indexes = {}
+            self._unread_totals = {}
+            self._derived_generation = self.generation
+
+    def _collection_index(self, collection: str, owner: Optional[str] = None,
+                          build: bool = True) -> Optional[CollectionIndex]:
+        self._check_generation()
+        key = (collection, owner)
+        index = self._indexes.get(key)
+        if index is None and build:
+            if collection == "users":
+                rows = self.data["users"]
+            else:
+                rows = self.data[collection].get(owner)
+                if rows is None:
+                    # Unknown owner: serve an empty, uncached index so bogus
+                    # ids cannot grow the cache
+                    return CollectionIndex(())
+            index = self._indexes[key] = CollectionIndex(rows)
+        return index
+
+    def _index_put(self, collection: str, row: Dict, owner: Optional[str] = None):
+        index = self._collection_index(collection, owner, build=False)
+        if index is not None:
+            index.put(row)
+
+    def _index_remove(self, collection: str, row_id: str, owner: Optional[str] = None):
+        index = self._collection_index(collection, owner, build=False)
+        if index is not None:
+            index.remove(row_id)
+
+    def _index_drop(self, collection: str, owner: str):
+        self._indexes.pop((collection, owner), None)
+
+    def _unread_total(self, user_id: str) -> int:
+        self._check_generation()
+        if user_id not in self._unread_totals:
+            self._unread_totals[user_id] = sum(
+                conv.get("unread", 0) for conv in self.data["conversations"].get(user_id, [])
+            )
+        return self._unread_totals[user_id]
+
+    def _adjust_unread_total(self, user_id: str, delta: int):
+        self._check_generation()
+        if delta and user_id in self._unread_totals:
+            self._unread_totals[user_id] += delta
+
+    @staticmethod
+    def _range_predicate(field: str, low: Any, high: Any) -> Callable[[Dict], bool]:
+        low_key = None if low is None else sort_key(low)
+        high_key = None if high is None else sort_key(high)
+
+        def matches(row: Dict) -> bool:
+            key = sort_key(row.get(field))
+            if low_key is not None and key < low_key:
+                return False
+            return high_key is None or key <= high_key
+        return matches
+
+    @staticmethod
+    def _all_of(*predicates: Optional[Callable[[Dict], bool]]) -> Optional[Callable[[Dict], bool]]:
+        active = [p for p in predicates if p is not None]
+        if not active:
+            return None
+        return lambda row: all(p(row) for p in active)
+
     # User operations
+    @_writer
     def create_user(self, user: User) -> User:
         user_dict = user.model_dump()
         self.data["users"].append(user_dict)
         self.data["conversations"][user.id] = []
         self.data["campaigns"][user.id] = []
+        self._index_put("users", user_dict)
+        self._index_drop("conversations", user.id)
+        self._index_drop("campaigns", user.id)
         self._save_data()
         return user
     
+    @_reader
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         for user_data in self.data["users"]:
             if user_data["id"] == user_id:
                 return User(**user_data)
         return None
     
+    @_reader
     def get_user_by_username(self, username: str) -> Optional[User]:
         for user_data in self.data["users"]:
             if user_data["username"] == username:
                 return User(**user_data)
         return None
     
+    @_reader
     def get_all_users(self) -> List[User]:
         return [User(**user_data) for user_data in self.data["users"]]
     
+    @_reader
+    def query_users(self, sort: str = "created_at", descending: bool = False,
+                    limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+        rows, next_cursor = self._collection_index("users").page(
+            sort, descending, limit, cursor
+        )
+        return [User(**row) for row in rows], next_cursor
+    
+    @_writer
     def update_user(self, user: User) -> User:
         for i, user_data in enumerate(self.data["users"]):
             if user_data["id"] == user.id:
                 self.data["users"][i] = user.model_dump()
+                self._index_put("users", self.data["users"][i])
                 self._save_data()
                 return user
         return user
     
+    @_writer
     def delete_user(self, user_id: str) -> bool:
         for i, user_data in enumerate(self.data["users"]):
             if user_data["id"] == user_id:
@@ -66,11 +457,16 @@ class SimpleDatabase:
                     del self.data["conversations"][user_id]
                 if user_id in self.data["campaigns"]:
                     del self.data["campaigns"][user_id]
+                self._index_remove("users", user_id)
+                self._unread_totals.pop(user_id, None)
+                self._index_drop("conversations", user_id)
+                self._index_drop("campaigns", user_id)
                 self._save_data()
                 return True
         return False
     
     # Instance operations (part of user)
+    @_writer
     def add_instance_to_user(self, user_id: str, instance: WhatsAppInstance) -> bool:
         user = self.get_user_by_id(user_id)
         if user:
@@ -79,6 +475,7 @@ class SimpleDatabase:
             return True
         return False
     
+    @_writer
     def update_instance(self, user_id: str, instance: WhatsAppInstance) -> bool:
         user = self.get_user_by_id(user_id)
         if user:
@@ -89,6 +486,23 @@ class SimpleDatabase:
                     return True
         return False
     
+    @_reader
+    def query_instances(self, user_id: str, sort: str = "created_at", descending: bool = False,
+                        limit: Optional[int] = None, cursor: Optional[str] = None,
+                        status: Optional[str] = None) -> Optional[Page]:
+        for user_data in self.data["users"]:
+            if user_data["id"] == user_id:
+                # Instances live inside the user row and are few; index them per query
+                predicate = None
+                if status is not None:
+                    predicate = lambda row: row.get("status") == status
+                rows, next_cursor = CollectionIndex(user_data["instances"]).page(
+                    sort, descending, limit, cursor, predicate
+                )
+                return [WhatsAppInstance(**row) for row in rows], next_cursor
+        return None
+    
+    @_writer
     def remove_instance(self, user_id: str, instance_id: str) -> bool:
         user = self.get_user_by_id(user_id)
         if user:
@@ -98,66 +512,273 @@ class SimpleDatabase:
         return False
     
     # Conversation operations
+    @_reader
     def get_user_conversations(self, user_id: str) -> List[Conversation]:
         convs_data = self.data["conversations"].get(user_id, [])
-        return [Conversation(**conv) for conv in convs_data]
+        return [_conversation_model(conv) for conv in convs_data]
+    
+    @_reader
+    def query_conversations(self, user_id: str, sort: str = "updated_at", descending: bool = True,
+                            limit: Optional[int] = None, cursor: Optional[str] = None,
+                            instance_id: Optional[str] = None, unread: Optional[bool] = None,
+                            updated_from: Optional[datetime] = None,
+                            updated_to: Optional[datetime] = None,
+                            with_messages: bool = True) -> Page:
+        low = high = None
+        range_predicate = None
+        if updated_from is not None or updated_to is not None:
+            if sort == "updated_at":
+                low, high = updated_from, updated_to
+            else:
+                range_predicate = self._range_predicate("updated_at", updated_from, updated_to)
+        predicate = self._all_of(
+            None if instance_id is None else lambda row: row.get("instance_id") == instance_id,
+            None if unread is None else lambda row: (row.get("unread", 0) > 0) == unread,
+            range_predicate,
+        )
+        rows, next_cursor = self._collection_index("conversations", user_id).page(
+            sort, descending, limit, cursor, predicate, low, high
+        )
+        return [_conversation_model(row, with_messages) for row in rows], next_cursor
     
+    @_writer
     def add_conversation(self, user_id: str, conversation: Conversation) -> Conversation:
         if user_id not in self.data["conversations"]:
             self.data["conversations"][user_id] = []
-        self.data["conversations"][user_id].append(conversation.model_dump())
+        self.data["conversations"][user_id].append(_conversation_row(conversation))
+        self._index_put("conversations", self.data["conversations"][user_id][-1], user_id)
+        self._adjust_unread_total(user_id, conversation.unread)
         self._save_data()
         return conversation
     
+    @_writer
     def update_conversation(self, user_id: str, conversation: Conversation) -> bool:
         if user_id in self.data["conversations"]:
             for i, conv in enumerate(self.data["conversations"][user_id]):
                 if conv["id"] == conversation.id:
-                    self.data["conversations"][user_id][i] = conversation.model_dump()
+                    row = _conversation_row(conversation)
+                    # Read state is only changed through journaled patches; a
+                    # model read before one of them must not roll it back
+                    row["unread"] = conv.get("unread", 0)
+                    row["last_read_at"] = conv.get("last_read_at")
+                    self.data["conversations"][user_id][i] = row
+                    self._index_put("conversations", row, user_id)
                     self._save_data()
                     return True
         return False
     
+    @_writer
+    def append_message(self, user_id: str, conversation_id: str, from_user: str,
+                       text: str, status: str = "sent") -> Optional[Message]:
+        """Append a message in place; messages from a contact count as unread."""
+        row = self._collection_index("conversations", user_id).rows.get(conversation_id)
+        if row is None:
+            return None
+        timestamp = time.time()
+        # Validate before touching the stored row
+        message = Message(
+            from_user=from_user, text=text, time=format_time(timestamp),
+            status=status, timestamp=timestamp
+        )
+        row["messages"].append(message.from_user, message.text, timestamp, message.status)
+        row["updated_at"] = datetime.utcnow()
+        if message.from_user != "me":
+            row["unread"] = row.get("unread", 0) + 1
+            self._adjust_unread_total(user_id, 1)
+        self._index_put("conversations", row, user_id)
+        self._save_data()
+        return message
+    
+    @_writer
     def delete_conversation(self, user_id: str, conversation_id: str) -> bool:
         if user_id in self.data["conversations"]:
+            for conv in self.data["conversations"][user_id]:
+                if conv["id"] == conversation_id:
+                    self._adjust_unread_total(user_id, -conv.get("unread", 0))
             self.data["conversations"][user_id] = [
                 conv for conv in self.data["conversations"][user_id] 
                 if conv["id"] != conversation_id
             ]
+            self._index_remove("conversations", conversation_id, user_id)
             self._save_data()
             return True
         return False
     
+    # Unread counters: touch only the counter fields and journal the change
+    def _patch_conversation(self, user_id: str, conversation_id: str,
+                            fields: Dict[str, Any]) -> Optional[Dict]:
+        row = self._collection_index("conversations", user_id).rows.get(conversation_id)
+        if row is None:
+            return None
+        self._apply_conversation_fields(user_id, row, fields)
+        self._append_journal(user_id, conversation_id, fields)
+        return row
+
+    def _apply_conversation_fields(self, user_id: str, row: Dict, fields: Dict[str, Any]):
+        if "unread" in fields:
+            self._adjust_unread_total(user_id, fields["unread"] - row.get("unread", 0))
+        row.update(fields)
+        self._index_put("conversations", row, user_id)
+    
+    @_writer
+    def increment_unread(self, user_id: str, conversation_id: str, delta: int = 1) -> Optional[int]:
+        """Add ``delta`` to a conversation's unread counter; returns the new value."""
+        row = self._collection_index("conversations", user_id).rows.get(conversation_id)
+        if row is None:
+            return None
+        unread = max(0, row.get("unread", 0) + delta)
+        self._patch_conversation(user_id, conversation_id, {"unread": unread})
+        return unread
+    
+    @_writer
+    def mark_conversation_read(self, user_id: str, conversation_id: str) -> Optional[datetime]:
+        """Clear a conversation's unread counter; returns the read timestamp."""
+        read_at = datetime.utcnow()
+        row = self._patch_conversation(
+            user_id, conversation_id, {"unread": 0, "last_read_at": read_at}
+        )
+        return read_at if row is not None else None
+    
+    @_reader
+    def get_unread_total(self, user_id: str) -> int:
+        return self._unread_total(user_id)
+    
+    @_reader
+    def get_conversation_stats(self, user_id: str) -> Dict[str, int]:
+        return {
+            "total": len(self.data["conversations"].get(user_id, [])),
+            "unread": self._unread_total(user_id),
+        }
+    
     # Campaign operations
+    @_reader
     def get_user_campaigns(self, user_id: str) -> List[Campaign]:
         camps_data = self.data["campaigns"].get(user_id, [])
         return [Campaign(**camp) for camp in camps_data]
     
+    @_reader
+    def query_campaigns(self, user_id: str, sort: str = "created_at", descending: bool = False,
+                        limit: Optional[int] = None, cursor: Optional[str] = None,
+                        status: Optional[str] = None, instance_id: Optional[str] = None) -> Page:
+        predicate = self._all_of(
+            None if status is None else lambda row: row.get("status") == status,
+            None if instance_id is None else lambda row: row.get("instance_id") == instance_id,
+        )
+        rows, next_cursor = self._collection_index("campaigns", user_id).page(
+            sort, descending, limit, cursor, predicate
+        )
+        return [Campaign(**row) for row in rows], next_cursor
+    
+    @_writer
     def add_campaign(self, user_id: str, campaign: Campaign) -> Campaign:
         if user_id not in self.data["campaigns"]:
             self.data["campaigns"][user_id] = []
         self.data["campaigns"][user_id].append(campaign.model_dump())
+        self._index_put("campaigns", self.data["campaigns"][user_id][-1], user_id)
         self._save_data()
         return campaign
     
+    @_writer
     def update_campaign(self, user_id: str, campaign: Campaign) -> bool:
         if user_id in self.data["campaigns"]:
             for i, camp in enumerate(self.data["campaigns"][user_id]):
                 if camp["id"] == campaign.id:
                     self.data["campaigns"][user_id][i] = campaign.model_dump()
+                    self._index_put("campaigns", self.data["campaigns"][user_id][i], user_id)
                     self._save_data()
                     return True
         return False
     
+    @_writer
     def delete_campaign(self, user_id: str, campaign_id: str) -> bool:
         if user_id in self.data["campaigns"]:
             self.data["campaigns"][user_id] = [
                 camp for camp in self.data["campaigns"][user_id] 
                 if camp["id"] != campaign_id
             ]
+            self._index_remove("campaigns", campaign_id, user_id)
             self._save_data()
             return True
         return False
 
+
+class AsyncDatabase:
+    """Async facade over SimpleDatabase.
+
+    Every call runs in a dedicated thread pool so blocking file I/O and
+    validation never stall the event loop; large payload encoding is
+    further handed to a process pool.
+    """
+
+    def __init__(self, database: SimpleDatabase, max_threads: int = DB_THREADS,
+                 max_processes: int = DB_PROCESSES):
+        self.database = database
+        self.max_threads = max(1, max_threads)
+        self.max_processes = max(0, max_processes)
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.max_threads, thread_name_prefix="db"
+            )
+        if self._processes is None and self.max_processes:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self.database.encode_executor = self._processes
+
+    def shutdown(self):
+        self.database.encode_executor = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+            self._processes = None
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable in the database thread pool."""
+        if self._threads is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._call, func, args, kwargs)
+        return await loop.run_in_executor(self._threads, call)
+
+    @staticmethod
+    def _call(func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with span(f"db.{func.__name__}"):
+            return func(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": self.max_threads,
+            "processes": self.max_processes,
+            "offload_threshold": self.database.offload_threshold,
+            "last_payload_size": self.database._last_payload_size,
+        }
+
+    def __getattr__(self, name: str):
+        method = getattr(self.database, name)
+        if name.startswith("_") or not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+        return call
+
+
+def _create_database() -> SimpleDatabase:
+    coordinator = None
+    if WORKERS > 1 and MULTIPROCESS_SUPPORTED:
+        coordinator = DataFileCoordinator("whatsapp_bot_data.json")
+    return SimpleDatabase(coordinator=coordinator)
+
+
 # Global database instance
-db = SimpleDatabase()
\ No newline at end of file
+db = _create_database()
+async_db = AsyncDatabase(db)
@@ -0,0 +1,146 @@
+import base64
+import bisect
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Greater than any stored id, used to bound inclusive range scans
+_MAX_ID = "\U0010ffff"
+
+Page = Tuple[List[Any], Optional[str]]
+
+# Strings that may be datetimes as the JSON file stores them (``str()``)
+_DATETIME_PREFIX = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}")
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that is malformed or was issued for another sort."""
+
+
+def sort_key(value: Any) -> tuple:
+    """Map a stored field value to a comparable key; missing values sort first.
+
+    Datetimes, and datetime strings read back from the JSON file, are
+    compared through the ``str()`` of their naive UTC value, so loaded and
+    freshly created rows agree whatever offset they were given with.
+    """
+    if value is None:
+        return (0, "")
+    if isinstance(value, str) and _DATETIME_PREFIX.match(value):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (1, str(value))
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (1, str(value).casefold())
+
+
+def encode_cursor(field: str, descending: bool, entry: tuple) -> str:
+    key, row_id = entry
+    raw = json.dumps([field, descending, list(key), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str, descending: bool) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        c_field, c_desc, key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not (isinstance(key, list) and len(key) == 2 and isinstance(row_id, str)):
+        raise InvalidCursor("Invalid cursor")
+    if c_field != field or c_desc != descending:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return (tuple(key), row_id)
+
+
+class SortedIndex:
+    """Secondary index of ``(sort_key, id)`` pairs kept in sorted order."""
+
+    def __init__(self, field: str, rows: Iterable[Dict[str, Any]]):
+        self.field = field
+        self._keys = {row["id"]: sort_key(row.get(field)) for row in rows}
+        self._entries = sorted((key, row_id) for row_id, key in self._keys.items())
+
+    def put(self, row: Dict[str, Any]):
+        key = sort_key(row.get(self.field))
+        if self._keys.get(row["id"]) == key:
+            return
+        self.remove(row["id"])
+        self._keys[row["id"]] = key
+        bisect.insort(self._entries, (key, row["id"]))
+
+    def remove(self, row_id: str):
+        key = self._keys.pop(row_id, None)
+        if key is not None:
+            del self._entries[bisect.bisect_left(self._entries, (key, row_id))]
+
+    def scan(self, descending: bool = False, after: Optional[tuple] = None,
+             low: Optional[tuple] = None, high: Optional[tuple] = None) -> Iterator[tuple]:
+        """Yield entries in order, starting past ``after`` and within [low, high]."""
+        entries = self._entries
+        start = 0 if low is None else bisect.bisect_left(entries, (low,))
+        end = len(entries) if high is None else bisect.bisect_right(entries, (high, _MAX_ID))
+        if not descending:
+            if after is not None:
+                start = max(start, bisect.bisect_right(entries, after))
+            for i in range(start, end):
+                yield entries[i]
+        else:
+            if after is not None:
+                end = min(end, bisect.bisect_left(entries, after))
+            for i in range(end - 1, start - 1, -1):
+                yield entries[i]
+
+
+class CollectionIndex:
+    """Rows of one collection keyed by id, with lazily built sorted indexes."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.rows = {row["id"]: row for row in rows}
+        self.sorted: Dict[str, SortedIndex] = {}
+
+    def by(self, field: str) -> SortedIndex:
+        if field not in self.sorted:
+            self.sorted[field] = SortedIndex(field, self.rows.values())
+        return self.sorted[field]
+
+    def put(self, row: Dict[str, Any]):
+        self.rows[row["id"]] = row
+        for index in self.sorted.values():
+            index.put(row)
+
+    def remove(self, row_id: str):
+        self.rows.pop(row_id, None)
+        for index in self.sorted.values():
+            index.remove(row_id)
+
+    def page(self, field: str, descending: bool = False, limit: Optional[int] = None,
+             cursor: Optional[str] = None,
+             predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+             low: Any = None, high: Any = None) -> Page:
+        """Return matching rows in sort order and the cursor for the next page."""
+        after = decode_cursor(cursor, field, descending) if cursor else None
+        entries = self.by(field).scan(
+            descending,
+            after=after,
+            low=None if low is None else sort_key(low),
+            high=None if high is None else sort_key(high),
+        )
+        rows: List[Dict[str, Any]] = []
+        last = None
+        for entry in entries:
+            row = self.rows[entry[1]]
+            if predicate is not None and not predicate(row):
+                continue
+            if limit is not None and len(rows) == limit:
+                return rows, encode_cursor(field, descending, last)
+            rows.append(row)
+            last = entry
+        return rows, None
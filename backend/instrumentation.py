@@ -0,0 +1,302 @@
+import asyncio
+import contextvars
+import functools
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+# Trace of the request being handled, set only when tracing was requested
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed-interval sleep.
+
+    A loop blocked by synchronous work (file I/O, JSON encoding) shows up
+    as lag; a healthy loop stays close to zero.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600, warn_after: float = 0.25):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.warn_after:
+                logger.warning("Event loop lagged %.1f ms", lag * 1000)
+
+    def stats(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "last_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        return {
+            "samples": len(samples),
+            "last_ms": round(self.samples[-1] * 1000, 3),
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 3),
+            "p99_ms": round(p99 * 1000, 3),
+            "max_ms": round(self.max_lag * 1000, 3),
+        }
+
+
+class Trace:
+    """Span durations collected for a single traced request."""
+
+    __slots__ = ("spans", "endpoint_done")
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, name: str, seconds: float):
+        self.spans.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """Render the spans as a ``Server-Timing`` header value."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.spans
+        )
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class span:
+    """Time a block into the current trace; a no-op when not tracing."""
+
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = _current_trace.get()
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class TracedRoute(APIRoute):
+    """API route recording ``handler`` and ``serialize`` spans when traced.
+
+    ``handler`` covers the endpoint function (including awaited database
+    calls); ``serialize`` is the time FastAPI spends turning its return
+    value into the response after the endpoint finished.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = self._trace_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _trace_endpoint(endpoint):
+        @functools.wraps(endpoint)
+        async def traced_endpoint(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return await endpoint(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                trace.endpoint_done = time.perf_counter()
+                trace.add("handler", trace.endpoint_done - started)
+        return traced_endpoint
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            response = await handler(request)
+            trace = _current_trace.get()
+            if trace is not None and trace.endpoint_done is not None:
+                trace.add("serialize", time.perf_counter() - trace.endpoint_done)
+            return response
+        return traced_handler
+
+
+class RequestProfilingMiddleware:
+    """ASGI middleware for opt-in request tracing and the slow-request log.
+
+    Requests carrying ``X-Trace: 1`` and a valid ``X-Admin-Token`` get a
+    ``Server-Timing`` response header with their span breakdown. Requests
+    slower than ``slow_threshold`` seconds are logged and appended to
+    ``slow_requests``. Untraced requests pay for two clock reads.
+    """
+
+    def __init__(self, app, slow_requests: Deque[Dict[str, Any]],
+                 admin_token: Optional[str] = None, slow_threshold: float = 1.0):
+        self.app = app
+        self.slow_requests = slow_requests
+        self.admin_token = admin_token
+        self.slow_threshold = slow_threshold
+
+    def _wants_trace(self, scope) -> bool:
+        if not self.admin_token:
+            return False
+        headers = dict(scope["headers"])
+        return (
+            headers.get(b"x-trace") == b"1"
+            and is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1"), self.admin_token)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace() if self._wants_trace(scope) else None
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    trace.add("total", time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", trace.server_timing().encode("latin-1"))
+                    ]
+            await send(message)
+
+        token = _current_trace.set(trace) if trace is not None else None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                _current_trace.reset(token)
+            elapsed = time.perf_counter() - started
+            if self.slow_threshold and elapsed >= self.slow_threshold:
+                self._record_slow(scope, status, elapsed, trace)
+
+    def _record_slow(self, scope, status: int, elapsed: float, trace: Optional[Trace]):
+        logger.warning("Slow request %s %s took %.1f ms",
+                       scope["method"], scope["path"], elapsed * 1000)
+        self.slow_requests.append({
+            "at": time.time(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 3),
+            "spans": None if trace is None else [
+                {"name": name, "duration_ms": round(seconds * 1000, 3)}
+                for name, seconds in trace.spans
+            ],
+        })
+
+
+def is_admin_token(candidate: Optional[str], admin_token: Optional[str]) -> bool:
+    if not (admin_token and candidate):
+        return False
+    # compare_digest rejects non-ASCII str, and headers are client-controlled
+    return hmac.compare_digest(
+        candidate.encode("utf-8", "surrogateescape"),
+        admin_token.encode("utf-8", "surrogateescape"),
+    )
+
+
+# Innermost frames, as (file, function), of threads parked waiting for work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its queue
+    ("connection.py", "wait"),
+}
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling every thread's stack at a fixed interval.
+
+    Produces collapsed stacks (``frame;frame;frame count`` per line), the
+    input format of flamegraph.pl, speedscope and similar tools. Threads
+    parked in a queue, lock or selector wait are skipped unless
+    ``include_idle`` is set.
+    """
+
+    def __init__(self):
+        self._running = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._running.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            return self._collapse(self._sample(seconds, interval, include_idle))
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds: float, interval: float, include_idle: bool = False) -> Counter:
+        stacks: Counter = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (not include_idle and _is_idle(frame)):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return stacks
+
+    @staticmethod
+    def _collapse(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,147 @@
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class MessageStatus(IntEnum):
+    SENT = 0
+    DELIVERED = 1
+    READ = 2
+    FAILED = 3
+    PENDING = 4
+
+
+_STATUS_BY_NAME = {status.name.lower(): status for status in MessageStatus}
+# Code for statuses outside MessageStatus; the name is kept on the side
+_OTHER_STATUS = 255
+
+
+def format_time(timestamp: float) -> str:
+    """Render a timestamp the way messages have always shown it (``%H:%M``)."""
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M")
+
+
+def _legacy_timestamp(time_str: Any, fallback: Optional[datetime]) -> float:
+    """Best-effort epoch time for messages stored with only ``%H:%M``.
+
+    The day comes from the conversation's ``updated_at``, the only date
+    those records have. It is stored as naive UTC while ``%H:%M`` is local
+    time, so it is converted first; a time later than ``updated_at``
+    belongs to the day before.
+    """
+    if fallback is None:
+        day = datetime.now().astimezone()
+    elif fallback.tzinfo is None:
+        day = fallback.replace(tzinfo=timezone.utc).astimezone()
+    else:
+        day = fallback.astimezone()
+    try:
+        hour, minute = (int(part) for part in str(time_str).split(":"))
+        moment = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    except ValueError:
+        return day.timestamp()
+    if moment > day:
+        moment -= timedelta(days=1)
+    return moment.timestamp()
+
+
+class MessageStore:
+    """Column-oriented message history of a single conversation.
+
+    Instead of one dict (or pydantic model) per message, each field lives
+    in its own column: epoch timestamps and status codes in typed arrays,
+    senders as indexes into a small table of interned names, and texts in
+    a plain list. Models are built only at the API boundary.
+    """
+
+    __slots__ = ("_timestamps", "_sender_ids", "_statuses", "_texts", "_senders",
+                 "_other_statuses", "_sender_index")
+
+    def __init__(self):
+        self._timestamps = array("d")
+        self._sender_ids = array("I")
+        self._statuses = array("B")
+        self._texts: List[str] = []
+        self._senders: List[str] = []
+        self._other_statuses: Optional[Dict[int, str]] = None
+        # name -> position in _senders; rebuilt instead of pickled
+        self._sender_index: Dict[str, int] = {}
+
+    def __getstate__(self):
+        return (self._timestamps, self._sender_ids, self._statuses, self._texts,
+                self._senders, self._other_statuses)
+
+    def __setstate__(self, state):
+        (self._timestamps, self._sender_ids, self._statuses, self._texts,
+         self._senders, self._other_statuses) = state
+        self._sender_index = {name: i for i, name in enumerate(self._senders)}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _sender_id(self, name: str) -> int:
+        sender_id = self._sender_index.get(name)
+        if sender_id is None:
+            name = sys.intern(name)
+            sender_id = self._sender_index[name] = len(self._senders)
+            self._senders.append(name)
+        return sender_id
+
+    def append(self, from_user: str, text: str, timestamp: float, status: str = "sent"):
+        """Add a message; invalid values raise before any column changes."""
+        if not isinstance(text, str) or not isinstance(status, str):
+            raise TypeError("Message text and status must be strings")
+        timestamp = float(timestamp)
+        code = _STATUS_BY_NAME.get(status, _OTHER_STATUS)
+        sender_id = self._sender_id(from_user)
+        # Nothing below can fail, so the columns stay aligned
+        if code == _OTHER_STATUS:
+            if self._other_statuses is None:
+                self._other_statuses = {}
+            self._other_statuses[len(self._texts)] = status
+        self._timestamps.append(timestamp)
+        self._sender_ids.append(sender_id)
+        self._statuses.append(code)
+        self._texts.append(text)
+
+    def status_at(self, index: int) -> str:
+        code = self._statuses[index]
+        if code == _OTHER_STATUS:
+            return self._other_statuses[index]
+        return MessageStatus(code).name.lower()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield each message as a ``Message``-shaped dict."""
+        senders = self._senders
+        for i, (timestamp, sender_id, text) in enumerate(
+            zip(self._timestamps, self._sender_ids, self._texts)
+        ):
+            yield {
+                "from_user": senders[sender_id],
+                "text": text,
+                "time": format_time(timestamp),
+                "status": self.status_at(i),
+                "timestamp": timestamp,
+            }
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any], fallback: Optional[datetime] = None) -> "MessageStore":
+        """Build a store from message dicts or models.
+
+        Records without ``timestamp`` (older data) get one derived from
+        their ``time`` and ``fallback``.
+        """
+        store = cls()
+        for record in records:
+            if not isinstance(record, dict):
+                record = record.model_dump()
+            timestamp = record.get("timestamp")
+            if timestamp is None:
+                timestamp = _legacy_timestamp(record.get("time"), fallback)
+            store.append(record["from_user"], record["text"], timestamp, record.get("status", "sent"))
+        return store
@@ -23,8 +23,9 @@ class WhatsAppInstance(BaseModel):
 class Message(BaseModel):
     from_user: str  # 'me' or contact name
     text: str
-    time: str
-    status: str = "sent"
+    time: str  # %H:%M, for display
+    status: str = "sent"  # sent, delivered, read, failed, pending
+    timestamp: Optional[float] = None  # epoch seconds
 
 class Conversation(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -32,6 +33,7 @@ class Conversation(BaseModel):
     name: str
     phone: Optional[str] = None
     unread: int = 0
+    last_read_at: Optional[datetime] = None
     messages: List[Message] = Field(default_factory=list)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -60,8 +62,8 @@ class ConversationCreate(BaseModel):
     phone: Optional[str] = None
 
 class MessageCreate(BaseModel):
-    conversation_id: str
     text: str
+    from_user: str = "me"  # 'me' or contact name
 
 class CampaignCreate(BaseModel):
     name: str
@@ -0,0 +1,23 @@
+import json
+from typing import Any, Dict
+
+from .messages import MessageStore
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, MessageStore):
+        return value.to_list()
+    return str(value)
+
+
+def encode_payload(data: Dict[str, Any]) -> str:
+    """Encode the data store as the JSON text written to disk.
+
+    Kept free of heavy imports so it can run inside worker processes.
+    """
+    return json.dumps(data, indent=2, ensure_ascii=False, default=_encode_default)
+
+
+def encode_payload_bytes(data: Dict[str, Any]) -> bytes:
+    """UTF-8 encoded form of ``encode_payload``, as written to disk."""
+    return encode_payload(data).encode("utf-8")
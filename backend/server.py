@@ -1,8 +1,11 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Request
+from fastapi import FastAPI, HTTPException, APIRouter, Request, Query, Response, Header, Depends
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
+from collections import deque
+import asyncio
 import os
 import logging
 from pathlib import Path
@@ -12,17 +15,29 @@ from .models import (
     User, WhatsAppInstance, Conversation, Message, Campaign,
     UserCreate, InstanceCreate, ConversationCreate, MessageCreate, CampaignCreate
 )
-from .database import db
+from .database import async_db, db
+from .coordination import LeaderElection
+from .indexes import InvalidCursor
+from .instrumentation import (
+    LoopLagMonitor, RequestProfilingMiddleware, SamplingProfiler, TracedRoute, is_admin_token
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Profiling configuration: admin endpoints and tracing stay off without a token
+ADMIN_TOKEN = os.getenv('WHATSAPP_BOT_ADMIN_TOKEN') or None
+try:
+    SLOW_REQUEST_MS = float(os.getenv('WHATSAPP_BOT_SLOW_REQUEST_MS', '1000'))
+except ValueError:
+    SLOW_REQUEST_MS = 1000.0
+
 # Create the main app
 app = FastAPI(title="WhatsApp Bot Management System", version="1.0.0")
 
 # Create API router
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=TracedRoute)
 
 # CORS middleware
 app.add_middleware(
@@ -31,30 +46,121 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# Request tracing and slow-request log
+slow_requests = deque(maxlen=100)
+app.add_middleware(
+    RequestProfilingMiddleware,
+    slow_requests=slow_requests,
+    admin_token=ADMIN_TOKEN,
+    slow_threshold=SLOW_REQUEST_MS / 1000,
+)
+profiler = SamplingProfiler()
+
+# Event loop responsiveness instrumentation
+loop_monitor = LoopLagMonitor()
+
+# Background engines registered here run in a single worker process
+leader = LeaderElection(f"{db.data_file}.leader")
+
+@leader.register
+async def refresh_data_snapshot():
+    """Write the startup snapshot once the server is up, off the request path"""
+    await async_db.save_snapshot()
+
+@app.on_event("startup")
+async def start_background_services():
+    async_db.start()
+    loop_monitor.start()
+    leader.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    if leader.is_leader:
+        await async_db.save_snapshot()
+    await leader.stop()
+    await loop_monitor.stop()
+    async_db.shutdown()
+
+# === LIST HELPERS ===
+
+# Fields each list endpoint can be sorted by
+USER_SORT_FIELDS = {"created_at", "name", "username"}
+INSTANCE_SORT_FIELDS = {"created_at", "name", "status", "last_access"}
+CONVERSATION_SORT_FIELDS = {"updated_at", "name"}
+CAMPAIGN_SORT_FIELDS = {"created_at", "name", "status", "scheduled_at"}
+
+MAX_PAGE_SIZE = 1000
+
+def parse_sort(sort: Optional[str], allowed: Set[str], default: str) -> Tuple[str, bool]:
+    """Parse a `field` / `-field` sort parameter"""
+    value = sort or default
+    descending = value.startswith("-")
+    field = value[1:] if descending else value
+    if field not in allowed:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{field}'")
+    return field, descending
+
+def parse_fields(fields: Optional[str], model) -> Optional[Set[str]]:
+    """Parse a comma separated `fields` projection; `id` is always included"""
+    if not fields:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected | {"id"}
+
+async def query_page(method: str, *args, **kwargs):
+    """Run a paginated database query, mapping bad cursors to 400"""
+    try:
+        return await getattr(async_db, method)(*args, **kwargs)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def page_response(page, response: Response, fields: Optional[Set[str]]):
+    """Return a page of items, exposing the next cursor in a header"""
+    items, next_cursor = page
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fields is None:
+        response.headers.update(headers)
+        return items
+    projected = [item.model_dump(include=fields) for item in items]
+    return JSONResponse(jsonable_encoder(projected), headers=headers)
+
 # === USER ROUTES ===
 
 @api_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreate):
     """Create a new user"""
     # Check if username already exists
-    existing_user = db.get_user_by_username(user_data.username)
+    existing_user = await async_db.get_user_by_username(user_data.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
     user = User(**user_data.model_dump())
-    return db.create_user(user)
+    return await async_db.create_user(user)
 
 @api_router.get("/users", response_model=List[User])
-async def get_users():
-    """Get all users"""
-    return db.get_all_users()
+async def get_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get users, optionally paginated, sorted and projected"""
+    sort_field, descending = parse_sort(sort, USER_SORT_FIELDS, "created_at")
+    projection = parse_fields(fields, User)
+    page = await query_page("query_users", sort_field, descending, limit, cursor)
+    return page_response(page, response, projection)
 
 @api_router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
     """Get user by ID"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -62,25 +168,25 @@ async def get_user(user_id: str):
 @api_router.put("/users/{user_id}", response_model=User)
 async def update_user(user_id: str, user_data: UserCreate):
     """Update user"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check username conflict
     if user_data.username != user.username:
-        existing = db.get_user_by_username(user_data.username)
+        existing = await async_db.get_user_by_username(user_data.username)
         if existing:
             raise HTTPException(status_code=400, detail="Username already exists")
     
     user.name = user_data.name
     user.username = user_data.username
     user.password = user_data.password
-    return db.update_user(user)
+    return await async_db.update_user(user)
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str):
     """Delete user"""
-    if not db.delete_user(user_id):
+    if not await async_db.delete_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
 
@@ -92,7 +198,7 @@ async def login(credentials: dict):
     username = credentials.get("username")
     password = credentials.get("password")
     
-    user = db.get_user_by_username(username)
+    user = await async_db.get_user_by_username(username)
     if not user or user.password != password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -103,27 +209,39 @@ async def login(credentials: dict):
 @api_router.post("/users/{user_id}/instances", response_model=WhatsAppInstance)
 async def create_instance(user_id: str, instance_data: InstanceCreate):
     """Create new WhatsApp instance for user"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     instance = WhatsAppInstance(**instance_data.model_dump())
-    if db.add_instance_to_user(user_id, instance):
+    if await async_db.add_instance_to_user(user_id, instance):
         return instance
     raise HTTPException(status_code=500, detail="Failed to create instance")
 
 @api_router.get("/users/{user_id}/instances", response_model=List[WhatsAppInstance])
-async def get_user_instances(user_id: str):
-    """Get all instances for user"""
-    user = db.get_user_by_id(user_id)
-    if not user:
+async def get_user_instances(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """Get instances for user, optionally paginated, filtered and sorted"""
+    sort_field, descending = parse_sort(sort, INSTANCE_SORT_FIELDS, "created_at")
+    projection = parse_fields(fields, WhatsAppInstance)
+    page = await query_page(
+        "query_instances", user_id, sort_field, descending, limit, cursor, status=status
+    )
+    if page is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user.instances
+    return page_response(page, response, projection)
 
 @api_router.put("/users/{user_id}/instances/{instance_id}", response_model=WhatsAppInstance)
 async def update_instance(user_id: str, instance_id: str, instance_data: InstanceCreate):
     """Update WhatsApp instance"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -139,14 +257,14 @@ async def update_instance(user_id: str, instance_id: str, instance_data: Instanc
     instance.name = instance_data.name
     instance.phone = instance_data.phone
     
-    if db.update_instance(user_id, instance):
+    if await async_db.update_instance(user_id, instance):
         return instance
     raise HTTPException(status_code=500, detail="Failed to update instance")
 
 @api_router.post("/users/{user_id}/instances/{instance_id}/reconnect")
 async def reconnect_instance(user_id: str, instance_id: str):
     """Reconnect WhatsApp instance"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -154,7 +272,7 @@ async def reconnect_instance(user_id: str, instance_id: str):
         if instance.id == instance_id:
             instance.status = "active"
             instance.last_access = datetime.utcnow()
-            db.update_instance(user_id, instance)
+            await async_db.update_instance(user_id, instance)
             return {"message": "Instance reconnected successfully"}
     
     raise HTTPException(status_code=404, detail="Instance not found")
@@ -162,14 +280,14 @@ async def reconnect_instance(user_id: str, instance_id: str):
 @api_router.post("/users/{user_id}/instances/{instance_id}/disconnect")
 async def disconnect_instance(user_id: str, instance_id: str):
     """Disconnect WhatsApp instance"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     for instance in user.instances:
         if instance.id == instance_id:
             instance.status = "offline"
-            db.update_instance(user_id, instance)
+            await async_db.update_instance(user_id, instance)
             return {"message": "Instance disconnected successfully"}
     
     raise HTTPException(status_code=404, detail="Instance not found")
@@ -177,73 +295,106 @@ async def disconnect_instance(user_id: str, instance_id: str):
 @api_router.delete("/users/{user_id}/instances/{instance_id}")
 async def delete_instance(user_id: str, instance_id: str):
     """Delete WhatsApp instance"""
-    if not db.remove_instance(user_id, instance_id):
+    if not await async_db.remove_instance(user_id, instance_id):
         raise HTTPException(status_code=404, detail="Instance not found")
     return {"message": "Instance deleted successfully"}
 
 # === CONVERSATION ROUTES ===
 
 @api_router.get("/users/{user_id}/conversations", response_model=List[Conversation])
-async def get_conversations(user_id: str):
-    """Get all conversations for user"""
-    return db.get_user_conversations(user_id)
+async def get_conversations(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    instance_id: Optional[str] = None,
+    unread: Optional[bool] = None,
+    updated_from: Optional[datetime] = None,
+    updated_to: Optional[datetime] = None
+):
+    """Get conversations for user, optionally paginated, filtered and sorted"""
+    sort_field, descending = parse_sort(sort, CONVERSATION_SORT_FIELDS, "-updated_at")
+    projection = parse_fields(fields, Conversation)
+    page = await query_page(
+        "query_conversations", user_id, sort_field, descending, limit, cursor,
+        instance_id=instance_id, unread=unread,
+        updated_from=updated_from, updated_to=updated_to,
+        # Messages are the bulk of a conversation; skip them when not projected
+        with_messages=projection is None or "messages" in projection
+    )
+    return page_response(page, response, projection)
 
 @api_router.post("/users/{user_id}/conversations", response_model=Conversation)
 async def create_conversation(user_id: str, conv_data: ConversationCreate):
     """Create new conversation"""
     conversation = Conversation(**conv_data.model_dump())
-    return db.add_conversation(user_id, conversation)
+    return await async_db.add_conversation(user_id, conversation)
 
 @api_router.post("/users/{user_id}/conversations/{conversation_id}/messages")
-async def send_message(user_id: str, conversation_id: str, message_data: dict):
-    """Send message in conversation"""
-    conversations = db.get_user_conversations(user_id)
-    conversation = None
-    for conv in conversations:
-        if conv.id == conversation_id:
-            conversation = conv
-            break
-    
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    message = Message(
-        from_user="me",
-        text=message_data["text"],
-        time=datetime.now().strftime("%H:%M")
+async def send_message(user_id: str, conversation_id: str, message_data: MessageCreate):
+    """Send message in conversation; messages from a contact count as unread"""
+    message = await async_db.append_message(
+        user_id, conversation_id,
+        from_user=message_data.from_user,
+        text=message_data.text
     )
-    
-    conversation.messages.append(message)
-    conversation.updated_at = datetime.utcnow()
-    
-    if db.update_conversation(user_id, conversation):
-        return {"message": "Message sent successfully"}
-    raise HTTPException(status_code=500, detail="Failed to send message")
+    if message is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"message": "Message sent successfully"}
+
+@api_router.post("/users/{user_id}/conversations/{conversation_id}/read")
+async def mark_conversation_read(user_id: str, conversation_id: str):
+    """Mark conversation as read, clearing its unread counter"""
+    read_at = await async_db.mark_conversation_read(user_id, conversation_id)
+    if read_at is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {
+        "message": "Conversation marked as read",
+        "last_read_at": read_at,
+        "unread_total": await async_db.get_unread_total(user_id)
+    }
 
 @api_router.delete("/users/{user_id}/conversations/{conversation_id}")
 async def delete_conversation(user_id: str, conversation_id: str):
     """Delete conversation"""
-    if not db.delete_conversation(user_id, conversation_id):
+    if not await async_db.delete_conversation(user_id, conversation_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
     return {"message": "Conversation deleted successfully"}
 
 # === CAMPAIGN ROUTES ===
 
 @api_router.get("/users/{user_id}/campaigns", response_model=List[Campaign])
-async def get_campaigns(user_id: str):
-    """Get all campaigns for user"""
-    return db.get_user_campaigns(user_id)
+async def get_campaigns(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    instance_id: Optional[str] = None
+):
+    """Get campaigns for user, optionally paginated, filtered and sorted"""
+    sort_field, descending = parse_sort(sort, CAMPAIGN_SORT_FIELDS, "created_at")
+    projection = parse_fields(fields, Campaign)
+    page = await query_page(
+        "query_campaigns", user_id, sort_field, descending, limit, cursor,
+        status=status, instance_id=instance_id
+    )
+    return page_response(page, response, projection)
 
 @api_router.post("/users/{user_id}/campaigns", response_model=Campaign)
 async def create_campaign(user_id: str, campaign_data: CampaignCreate):
     """Create new campaign"""
     campaign = Campaign(**campaign_data.model_dump())
-    return db.add_campaign(user_id, campaign)
+    return await async_db.add_campaign(user_id, campaign)
 
 @api_router.put("/users/{user_id}/campaigns/{campaign_id}", response_model=Campaign)
 async def update_campaign(user_id: str, campaign_id: str, campaign_data: CampaignCreate):
     """Update campaign"""
-    campaigns = db.get_user_campaigns(user_id)
+    campaigns = await async_db.get_user_campaigns(user_id)
     campaign = None
     for camp in campaigns:
         if camp.id == campaign_id:
@@ -259,14 +410,14 @@ async def update_campaign(user_id: str, campaign_id: str, campaign_data: Campaig
     campaign.target_groups = campaign_data.target_groups
     campaign.scheduled_at = campaign_data.scheduled_at
     
-    if db.update_campaign(user_id, campaign):
+    if await async_db.update_campaign(user_id, campaign):
         return campaign
     raise HTTPException(status_code=500, detail="Failed to update campaign")
 
 @api_router.delete("/users/{user_id}/campaigns/{campaign_id}")
 async def delete_campaign(user_id: str, campaign_id: str):
     """Delete campaign"""
-    if not db.delete_campaign(user_id, campaign_id):
+    if not await async_db.delete_campaign(user_id, campaign_id):
         raise HTTPException(status_code=404, detail="Campaign not found")
     return {"message": "Campaign deleted successfully"}
 
@@ -275,18 +426,18 @@ async def delete_campaign(user_id: str, campaign_id: str):
 @api_router.get("/users/{user_id}/dashboard")
 async def get_dashboard_data(user_id: str):
     """Get dashboard statistics for user"""
-    user = db.get_user_by_id(user_id)
+    user = await async_db.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    conversations = db.get_user_conversations(user_id)
-    campaigns = db.get_user_campaigns(user_id)
+    conversation_stats = await async_db.get_conversation_stats(user_id)
+    campaigns = await async_db.get_user_campaigns(user_id)
     
     # Calculate metrics
     total_instances = len(user.instances)
     active_instances = len([i for i in user.instances if i.status == "active"])
-    total_conversations = len(conversations)
-    unread_messages = sum(conv.unread for conv in conversations)
+    total_conversations = conversation_stats["total"]
+    unread_messages = conversation_stats["unread"]
     active_campaigns = len([c for c in campaigns if c.status == "active"])
     
     return {
@@ -301,6 +452,47 @@ async def get_dashboard_data(user_id: str):
         }
     }
 
+# === SYSTEM ROUTES ===
+
+@api_router.get("/system/metrics")
+async def get_system_metrics():
+    """Get event loop lag and database executor statistics"""
+    return {
+        "worker": {"pid": os.getpid(), "leader": leader.is_leader},
+        "loop_lag": loop_monitor.stats(),
+        "database": async_db.stats()
+    }
+
+# === ADMIN ROUTES ===
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not is_admin_token(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@api_router.post("/admin/profile", response_class=PlainTextResponse,
+                 dependencies=[Depends(require_admin)])
+async def profile_server(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    idle: bool = False
+):
+    """Sample the running server and return collapsed stacks for flamegraphs"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            None, profiler.profile, seconds, interval_ms / 1000, idle
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.get("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def get_slow_requests():
+    """Get the most recent requests slower than the configured threshold"""
+    return {"threshold_ms": SLOW_REQUEST_MS, "requests": list(slow_requests)}
+
 # Include API router
 app.include_router(api_router)
 
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Mede o atraso (lag) do event loop sob carga de escrita, com a codificação
+JSON feita no processo do servidor e com ela enviada ao pool de processos.
+
+Cada modo roda em um subprocesso próprio, em um diretório temporário com
+um arquivo de dados sintético, e lê ``/api/system/metrics`` ao final.
+
+Uso:
+    python benchmarks/loop_lag.py [--conversations N] [--messages M] [--writes W]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    # WHATSAPP_BOT_DB_PROCESSES=0 desliga o pool de processos
+    "local": {"WHATSAPP_BOT_DB_PROCESSES": "0"},
+    # Limite 0: toda gravação é codificada no processo filho
+    "offload": {"WHATSAPP_BOT_DB_PROCESSES": "1", "WHATSAPP_BOT_DB_OFFLOAD_BYTES": "0"},
+}
+
+
+def write_data_file(path, conversations, messages):
+    """Cria um arquivo de dados com um usuário e muitas conversas"""
+    now = time.time()
+    user_id = "bench-user"
+    data = {
+        "users": [{
+            "id": user_id, "name": "Bench", "username": "bench", "password": "bench",
+            "created_at": "2024-01-01T00:00:00", "instances": [],
+        }],
+        "conversations": {user_id: [
+            {
+                "id": f"conv-{c}", "instance_id": "inst", "name": f"Contato {c}",
+                "phone": None, "unread": 0, "last_read_at": None,
+                "updated_at": "2024-01-01T00:00:00",
+                "messages": [
+                    {
+                        "from_user": "me" if m % 2 else f"Contato {c}",
+                        "text": f"Mensagem de teste número {m}",
+                        "time": "12:00", "status": "read",
+                        "timestamp": now - (messages - m) * 60,
+                    }
+                    for m in range(messages)
+                ],
+            }
+            for c in range(conversations)
+        ]},
+        "campaigns": {user_id: []},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return user_id
+
+
+async def run_load(writes, conversations):
+    """Dispara as gravações concorrentes e devolve as métricas do servidor"""
+    import httpx
+    from backend import server
+
+    await server.start_background_services()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                client.post(
+                    f"/api/users/bench-user/conversations/conv-{i % conversations}/messages",
+                    json={"text": f"carga {i}"},
+                )
+                for i in range(writes)
+            ))
+            elapsed = time.perf_counter() - started
+            metrics = (await client.get("/api/system/metrics")).json()
+    finally:
+        await server.stop_background_services()
+    metrics["elapsed_s"] = round(elapsed, 3)
+    return metrics
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        write_data_file(os.path.join(workdir, "whatsapp_bot_data.json"),
+                        args.conversations, args.messages)
+        env = dict(os.environ, **MODES[mode], PYTHONPATH=str(ROOT))
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", str(args.writes), str(args.conversations)],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True,
+        )
+        size = os.path.getsize(os.path.join(workdir, "whatsapp_bot_data.json"))
+    return size, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de lag do event loop")
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--writes', type=int, default=50)
+    parser.add_argument('--child', nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        metrics = asyncio.run(run_load(*args.child))
+        print(json.dumps(metrics))
+        return
+
+    print(f"📊 {args.conversations} conversas x {args.messages} mensagens, "
+          f"{args.writes} gravações concorrentes\n")
+    for mode in MODES:
+        size, metrics = run_mode(mode, args)
+        lag = metrics["loop_lag"]
+        print(f"{mode:<8} arquivo {size / 1024 / 1024:6.1f} MB  "
+              f"lag p99 {lag['p99_ms']:8.1f} ms  máx {lag['max_ms']:8.1f} ms  "
+              f"média {lag['avg_ms']:7.1f} ms  total {metrics['elapsed_s']:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compara o uso de memória do histórico de mensagens em três formatos:
+modelos Pydantic, dicts (formato antigo em memória) e MessageStore colunar.
+
+Uso:
+    python benchmarks/message_memory.py [--conversations N] [--messages M]
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.messages import MessageStore, format_time  # noqa: E402
+from backend.models import Message  # noqa: E402
+
+TEXTS = [
+    "Olá, tudo bem?",
+    "Gostaria de saber o preço do produto",
+    "Pedido confirmado, obrigado!",
+    "Pode me enviar o catálogo?",
+]
+
+
+def message_records(conversation, count):
+    """Gera registros de mensagens no formato salvo em JSON"""
+    start = time.time() - count * 60
+    for i in range(count):
+        timestamp = start + i * 60
+        yield {
+            "from_user": "me" if i % 2 else f"Contato {conversation}",
+            "text": f"{TEXTS[i % len(TEXTS)]} #{i}",
+            "time": format_time(timestamp),
+            "status": "read" if i % 3 else "sent",
+            "timestamp": timestamp,
+        }
+
+
+def build_models(conversations, messages):
+    return [
+        [Message(**record) for record in message_records(c, messages)]
+        for c in range(conversations)
+    ]
+
+
+def build_dicts(conversations, messages):
+    return [list(message_records(c, messages)) for c in range(conversations)]
+
+
+def build_store(conversations, messages):
+    return [
+        MessageStore.from_records(message_records(c, messages))
+        for c in range(conversations)
+    ]
+
+
+def measure(builder, conversations, messages):
+    """Retorna os bytes alocados e mantidos pela estrutura construída"""
+    gc.collect()
+    tracemalloc.start()
+    data = builder(conversations, messages)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memória das mensagens")
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=500)
+    args = parser.parse_args()
+
+    total = args.conversations * args.messages
+    print(f"📊 {args.conversations} conversas x {args.messages} mensagens = {total} mensagens\n")
+
+    results = [
+        ("Pydantic (Message)", measure(build_models, args.conversations, args.messages)),
+        ("dict", measure(build_dicts, args.conversations, args.messages)),
+        ("MessageStore", measure(build_store, args.conversations, args.messages)),
+    ]
+    baseline = results[0][1]
+    for name, size in results:
+        print(f"{name:<20} {size / 1024 / 1024:8.1f} MB  "
+              f"{size / total:6.0f} B/msg  {size / baseline:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ Sistema completo de gestão de chatbot do WhatsApp com interface web.
 Execute este arquivo para iniciar o sistema completo.
 
 Uso:
-    python main.py [--host HOST] [--port PORT] [--public-url URL] [--dev]
+    python main.py [--host HOST] [--port PORT] [--public-url URL] [--dev] [--workers N]
 
 Exemplos:
     python main.py                    # Servidor padrão (acesso: http://78.46.250.112/)
@@ -17,13 +17,13 @@ alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
 
     python main.py --public-url http://meuservidor.com/   # URL pública personalizada
     python main.py --dev              # Modo desenvolvimento (auto-reload)
+    python main.py --workers 4        # Produção com 4 processos
 """
 
 import os
 import sys
+import time
 import argparse
-import subprocess
-import importlib
 from pathlib import Path
 
 # Lista de dependências necessárias
@@ -35,8 +35,18 @@ REQUIRED_PACKAGES = [
     'python-multipart>=0.0.9'
 ]
 
+# Pacotes verificados na inicialização: distribuição -> módulo importado
+PACKAGES_TO_CHECK = {
+    'fastapi': 'fastapi',
+    'uvicorn': 'uvicorn',
+    'python-dotenv': 'dotenv',
+    'pydantic': 'pydantic'
+}
+
+# Duração de cada fase da inicialização, em segundos
+STARTUP_TIMINGS = {}
+
 # Configurações padrão que podem ser sobrescritas via variáveis de ambiente
-alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
 DEFAULT_HOST = os.getenv('WHATSAPP_BOT_HOST', '78.46.250.112')
 
 try:
@@ -45,25 +55,30 @@ except ValueError:
     DEFAULT_PORT = 8000
 DEFAULT_PUBLIC_URL = os.getenv('WHATSAPP_BOT_PUBLIC_URL', 'http://78.46.250.112/')
 
+try:
+    DEFAULT_WORKERS = int(os.getenv('WHATSAPP_BOT_WORKERS', '1'))
+except ValueError:
+    DEFAULT_WORKERS = 1
+
 def check_and_install_dependencies():
     """Verifica e instala dependências necessárias"""
     print("🔍 Verificando dependências...")
     
+    # Consulta apenas os metadados instalados, sem importar os pacotes
+    from importlib import metadata
+    
     missing_packages = []
-    packages_to_check = ['fastapi', 'uvicorn', 'dotenv', 'pydantic']
     
-    for pkg_name in packages_to_check:
+    for dist_name, pkg_name in PACKAGES_TO_CHECK.items():
         try:
-            if pkg_name == 'dotenv':
-                importlib.import_module('dotenv')
-            else:
-                importlib.import_module(pkg_name)
+            metadata.version(dist_name)
             print(f"✅ {pkg_name} já instalado")
-        except ImportError:
+        except metadata.PackageNotFoundError:
             missing_packages.append(pkg_name)
             print(f"❌ {pkg_name} não encontrado")
     
     if missing_packages:
+        import subprocess
         print(f"\n📦 Instalando {len(missing_packages)} pacote(s) faltante(s)...")
         try:
             subprocess.check_call([
@@ -104,11 +119,38 @@ def create_data_file():
             json.dump(initial_data, f, indent=2, ensure_ascii=False)
         print("📄 Arquivo de dados inicial criado")
 
-def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, dev_mode=False, public_url=None):
+def record_timing(phase, started):
+    """Registra a duração de uma fase da inicialização"""
+    STARTUP_TIMINGS[phase] = time.perf_counter() - started
+
+def print_timings():
+    """Exibe o tempo gasto em cada fase da inicialização"""
+    phases = " · ".join(
+        f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in STARTUP_TIMINGS.items()
+    )
+    print(f"⏱️  Inicialização: {phases}")
+
+def resolve_workers(workers, dev_mode=False):
+    """Define quantos processos do servidor podem ser usados"""
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if workers > 1 and dev_mode:
+        print("⚠️  --workers é ignorado no modo desenvolvimento")
+        return 1
+    if workers > 1:
+        from backend.coordination import MULTIPROCESS_SUPPORTED
+        if not MULTIPROCESS_SUPPORTED:
+            print("⚠️  Múltiplos processos não são suportados neste sistema; usando 1")
+            return 1
+    return workers
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, dev_mode=False, public_url=None,
+               workers=1):
     """Executa o servidor FastAPI"""
     try:
+        started = time.perf_counter()
         import uvicorn
-        from backend.server import app
+        record_timing("uvicorn", started)
 
         base_url = (public_url or f"http://{host}:{port}").rstrip('/')
 
@@ -125,7 +167,6 @@ def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, dev_mode=False, public_url=
         
         # Configurações do servidor
         config = {
-            "app": "backend.server:app",
             "host": host,
             "port": port,
             "log_level": "info"
@@ -133,11 +174,28 @@ def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, dev_mode=False, public_url=
         
         if dev_mode:
             config.update({
+                "app": "backend.server:app",
                 "reload": True,
                 "reload_dirs": ["backend", "static"]
             })
             print("🔄 Modo desenvolvimento ativado (auto-reload)")
+        elif workers > 1:
+            # Cada processo importa o app por conta própria
+            config.update({
+                "app": "backend.server:app",
+                "workers": workers
+            })
+            print(f"⚙️  Modo produção com {workers} processos")
+        else:
+            # Processo único: o app é importado uma só vez e entregue ao uvicorn
+            started = time.perf_counter()
+            from backend.server import app
+            from backend.database import db
+            record_timing("app", started)
+            STARTUP_TIMINGS[f"dados ({db.load_stats['source']})"] = db.load_stats["seconds"]
+            config["app"] = app
         
+        print_timings()
         uvicorn.run(**config)
         
     except KeyboardInterrupt:
@@ -163,6 +221,7 @@ alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
 
   python main.py --public-url http://meuservidor.com/   # URL pública personalizada
   python main.py --dev              # Modo desenvolvimento (auto-reload)
+  python main.py --workers 4        # Produção com 4 processos
         """
     )
 
@@ -185,6 +244,13 @@ alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
         help='Modo desenvolvimento com auto-reload'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Número de processos do servidor; 0 usa um por núcleo (padrão: {DEFAULT_WORKERS})'
+    )
+    
     parser.add_argument(
         '--skip-install',
         action='store_true',
@@ -215,14 +281,22 @@ alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
         print("❌ Python 3.8+ é necessário. Versão atual:", sys.version)
         return False
     
+    # Os processos do servidor herdam esta variável e coordenam o acesso aos dados
+    workers = resolve_workers(args.workers, dev_mode=args.dev)
+    os.environ['WHATSAPP_BOT_WORKERS'] = str(workers)
+    
     # Setup inicial
+    started = time.perf_counter()
     setup_directories()
     create_data_file()
+    record_timing("setup", started)
     
     # Verificar e instalar dependências
     if not args.skip_install:
+        started = time.perf_counter()
         if not check_and_install_dependencies():
             return False
+        record_timing("dependências", started)
     
     # Executar servidor
     public_url = (args.public_url or '').strip() or None
@@ -231,7 +305,8 @@ alterar-ip-de-acesso-para-78.46.250.112-gi6zdu
         host=args.host,
         port=args.port,
         dev_mode=args.dev,
-        public_url=public_url
+        public_url=public_url,
+        workers=workers
     )
 
 if __name__ == "__main__":
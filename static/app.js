@@ -474,8 +474,7 @@ async function renderNumbers(user) {
   }
   
   try {
-    const instances = await apiCall(`/users/${user.id}/instances`);
-    const sortedInstances = instances.sort((a,b) => new Date(b.created_at) - new Date(a.created_at));
+    const sortedInstances = await apiCall(`/users/${user.id}/instances?sort=-created_at`);
     
     container.innerHTML = `
       <div class="header">
@@ -777,8 +776,7 @@ async function renderCampaigns(user) {
   }
   
   try {
-    const campaigns = await apiCall(`/users/${user.id}/campaigns`);
-    const sortedCampaigns = campaigns.sort((a,b) => new Date(b.created_at) - new Date(a.created_at));
+    const sortedCampaigns = await apiCall(`/users/${user.id}/campaigns?sort=-created_at`);
     
     container.innerHTML = `
       <div class="header">
@@ -0,0 +1,24 @@
+import pytest
+
+from backend.database import SimpleDatabase
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    return str(tmp_path / "whatsapp_bot_data.json")
+
+
+@pytest.fixture
+def database(data_file):
+    return SimpleDatabase(data_file)
+
+
+@pytest.fixture
+def client(database, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    from backend import server
+
+    monkeypatch.setattr(server.async_db, "database", database)
+    return TestClient(server.app)
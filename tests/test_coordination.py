@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from backend.coordination import MULTIPROCESS_SUPPORTED, LeaderElection
+
+pytestmark = pytest.mark.skipif(not MULTIPROCESS_SUPPORTED, reason="requires flock")
+
+
+@pytest.fixture
+def lock_path(tmp_path):
+    return str(tmp_path / "whatsapp_bot_data.json.leader")
+
+
+def test_second_election_waits_for_the_leader_to_stop(lock_path):
+    async def scenario():
+        first, second = LeaderElection(lock_path), LeaderElection(lock_path)
+        assert first.try_acquire()
+        assert not second.try_acquire()
+
+        await first.stop()
+        assert not first.is_leader
+        assert second.try_acquire()
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_engines_run_only_in_the_leader(lock_path):
+    ran = []
+
+    async def scenario():
+        leader = LeaderElection(lock_path, retry_interval=0.01)
+        follower = LeaderElection(lock_path, retry_interval=0.01)
+        for name, election in (("leader", leader), ("follower", follower)):
+            election.register(lambda name=name: asyncio.sleep(0, ran.append(name)))
+
+        leader.start()
+        await asyncio.sleep(0.05)
+        follower.start()
+        await asyncio.sleep(0.05)
+
+        assert (leader.is_leader, follower.is_leader) == (True, False)
+        assert ran == ["leader"]
+
+        await leader.stop()
+        await asyncio.sleep(0.05)
+        assert follower.is_leader
+        assert ran == ["leader", "follower"]
+        await follower.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import os
+from datetime import datetime
+
+from backend.database import SimpleDatabase
+from backend.models import Campaign, Conversation, User
+
+
+def test_payload_size_is_measured_in_bytes(database):
+    database.create_user(User(name="João Ñandú", username="joao", password="x"))
+
+    # Non-ASCII names take more bytes than characters once encoded
+    assert database._last_payload_size == os.path.getsize(database.data_file)
+
+
+def test_snapshot_is_written_after_startup_not_on_load(database, data_file):
+    database.create_user(User(name="Ana", username="ana", password="x"))
+
+    reloaded = SimpleDatabase(data_file)
+    assert reloaded.load_stats["source"] == "json"
+    assert not os.path.exists(reloaded.snapshot_file)
+
+    assert reloaded.save_snapshot() is True
+    assert reloaded.save_snapshot() is False  # already matches the JSON
+    assert SimpleDatabase(data_file).load_stats["source"] == "snapshot"
+
+
+def test_snapshot_writable_by_others_is_not_trusted(database, data_file):
+    database.create_user(User(name="Ana", username="ana", password="x"))
+    database.save_snapshot()
+    os.chmod(database.snapshot_file, 0o666)
+
+    reloaded = SimpleDatabase(data_file)
+    assert reloaded.load_stats["source"] == "json"
+    assert reloaded.get_user_by_username("ana") is not None
+
+
+def test_queries_for_unknown_users_do_not_cache_indexes(database):
+    assert database.query_conversations("nobody") == ([], None)
+    assert database.query_campaigns("nobody") == ([], None)
+    assert database._indexes == {}
+
+
+def test_conversation_pages_follow_cursor(database):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    for name in ("c1", "c2", "c3"):
+        database.add_conversation(user.id, Conversation(instance_id="i", name=name))
+
+    first, cursor = database.query_conversations(user.id, sort="name", descending=False, limit=2)
+    second, end = database.query_conversations(user.id, sort="name", descending=False, limit=2, cursor=cursor)
+
+    assert [c.name for c in first + second] == ["c1", "c2", "c3"]
+    assert end is None
+
+
+def test_snapshot_is_not_reused_after_a_same_size_save_in_one_mtime_tick(database, data_file):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    database.save_snapshot()
+    before = os.stat(data_file)
+
+    user.name = "Bia"
+    database.update_user(user)
+    # Coarse clocks can give both saves the same mtime
+    os.utime(data_file, ns=(before.st_atime_ns, before.st_mtime_ns))
+    assert os.stat(data_file).st_size == before.st_size
+
+    reloaded = SimpleDatabase(data_file)
+    assert reloaded.load_stats["source"] == "json"
+    assert reloaded.get_user_by_id(user.id).name == "Bia"
+
+
+def test_sort_by_aware_datetime_survives_a_reload(database, data_file):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    for name, scheduled_at in (("c1", "2024-01-01T12:00:00+02:00"), ("c2", "2024-01-01T11:00:00")):
+        database.add_campaign(user.id, Campaign(
+            name=name, message="oi", instance_id="i",
+            scheduled_at=datetime.fromisoformat(scheduled_at),
+        ))
+
+    def order(db):
+        return [c.name for c in db.query_campaigns(user.id, sort="scheduled_at")[0]]
+
+    assert order(database) == ["c1", "c2"]
+    assert order(SimpleDatabase(data_file)) == ["c1", "c2"]
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+from backend.indexes import (
+    CollectionIndex, InvalidCursor, SortedIndex, decode_cursor, encode_cursor, sort_key,
+)
+
+ROWS = [
+    {"id": "a", "name": "Carla", "score": 3},
+    {"id": "b", "name": "ana", "score": 1},
+    {"id": "c", "name": "Bruno", "score": 2},
+    {"id": "d", "name": None, "score": 2},
+]
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_cursor_round_trip():
+    entry = (sort_key(datetime(2024, 1, 2, 3, 4)), "row-1")
+    cursor = encode_cursor("created_at", True, entry)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "created_at", True) == entry
+
+
+@pytest.mark.parametrize("cursor", ["not base64 !", "bm90IGpzb24", encode_cursor("x", False, ((1, 2), "a"))[:-3]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "x", False)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = encode_cursor("name", False, (sort_key("ana"), "b"))
+
+    with pytest.raises(InvalidCursor, match="does not match"):
+        decode_cursor(cursor, "name", True)
+    with pytest.raises(InvalidCursor, match="does not match"):
+        decode_cursor(cursor, "score", False)
+
+
+def test_sort_key_orders_missing_values_first_and_ignores_case():
+    assert sorted(["b", None, "A"], key=sort_key) == [None, "A", "b"]
+
+
+def test_scan_ascending_and_descending():
+    index = SortedIndex("score", ROWS)
+
+    assert [row_id for _, row_id in index.scan()] == ["b", "c", "d", "a"]
+    assert [row_id for _, row_id in index.scan(descending=True)] == ["a", "d", "c", "b"]
+
+
+def test_scan_range_is_inclusive():
+    index = SortedIndex("score", ROWS)
+
+    low, high = sort_key(2), sort_key(3)
+    assert [row_id for _, row_id in index.scan(low=low, high=high)] == ["c", "d", "a"]
+    assert [row_id for _, row_id in index.scan(True, low=low, high=low)] == ["d", "c"]
+
+
+def test_scan_resumes_after_entry_in_both_directions():
+    index = SortedIndex("score", ROWS)
+    after = (sort_key(2), "c")
+
+    assert [row_id for _, row_id in index.scan(after=after)] == ["d", "a"]
+    assert [row_id for _, row_id in index.scan(True, after=after)] == ["b"]
+
+
+def test_put_and_remove_keep_index_sorted():
+    index = CollectionIndex(dict(row) for row in ROWS)
+    index.by("score")
+
+    index.put({"id": "b", "name": "ana", "score": 9})
+    index.remove("a")
+    index.put({"id": "e", "name": "Eva", "score": 0})
+
+    assert ids(index.page("score")[0]) == ["e", "c", "d", "b"]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_paging_visits_every_row_once(descending):
+    index = CollectionIndex(ROWS)
+    expected, _ = index.page("name", descending)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = index.page("name", descending, limit=1, cursor=cursor)
+        seen.extend(rows)
+        if cursor is None:
+            break
+
+    assert ids(seen) == ids(expected)
+    assert ids(expected) == (["d", "b", "c", "a"] if not descending else ["a", "c", "b", "d"])
+
+
+def test_page_applies_predicate_before_limit():
+    index = CollectionIndex(ROWS)
+
+    rows, cursor = index.page("score", limit=1, predicate=lambda row: row["score"] == 2)
+    assert ids(rows) == ["c"]
+    rows, cursor = index.page("score", limit=1, cursor=cursor, predicate=lambda row: row["score"] == 2)
+    assert ids(rows) == ["d"]
+
+
+def test_datetimes_and_their_stored_strings_sort_alike():
+    aware = datetime.fromisoformat("2024-01-01T12:00:00+02:00")
+
+    assert sort_key(aware) == sort_key(str(aware)) == sort_key("2024-01-01 10:00:00")
+    assert sort_key("2024-01-01 10:00 reunião") == (1, "2024-01-01 10:00 reunião")
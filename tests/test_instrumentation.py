@@ -0,0 +1,25 @@
+import queue
+import threading
+
+from backend.instrumentation import SamplingProfiler, is_admin_token
+
+
+def test_admin_token_comparison():
+    assert is_admin_token("s3cret", "s3cret")
+    assert not is_admin_token("wrong", "s3cret")
+    assert not is_admin_token(None, "s3cret")
+    assert not is_admin_token("s3cret", None)
+    assert not is_admin_token("tökén", "s3cret")
+
+
+def test_profiler_skips_idle_threads_unless_asked():
+    jobs = queue.Queue()
+    waiter = threading.Thread(target=jobs.get, name="idle-waiter", daemon=True)
+    waiter.start()
+    try:
+        profiler = SamplingProfiler()
+        assert "idle-waiter" not in profiler.profile(0.05, 0.01)
+        assert "idle-waiter;" in profiler.profile(0.05, 0.01, include_idle=True)
+    finally:
+        jobs.put(None)
+        waiter.join()
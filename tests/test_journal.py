@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from backend import database as database_module
+from backend.coordination import MULTIPROCESS_SUPPORTED, DataFileCoordinator
+from backend.database import SimpleDatabase
+from backend.models import Conversation, User
+
+
+@pytest.fixture
+def conversation(database):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    conv = database.add_conversation(user.id, Conversation(instance_id="i", name="Bia"))
+    return user.id, conv.id
+
+
+def journal_lines(database):
+    with open(database.journal_file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def stored_unread(data_file):
+    with open(data_file, encoding="utf-8") as f:
+        data = json.load(f)
+    return [conv["unread"] for convs in data["conversations"].values() for conv in convs]
+
+
+def test_counter_updates_go_to_the_journal_and_are_replayed(database, data_file, conversation):
+    user_id, conv_id = conversation
+    database.increment_unread(user_id, conv_id)
+    database.increment_unread(user_id, conv_id)
+
+    assert stored_unread(data_file) == [0]
+    assert [entry["seq"] for entry in journal_lines(database)] == [1, 2]
+    assert SimpleDatabase(data_file).get_unread_total(user_id) == 2
+
+
+def test_full_save_folds_the_journal_into_the_data_file(database, data_file, conversation):
+    user_id, conv_id = conversation
+    database.increment_unread(user_id, conv_id)
+    database.append_message(user_id, conv_id, "Bia", "oi")
+
+    assert stored_unread(data_file) == [2]
+    assert journal_lines(database) == []
+    with open(data_file, encoding="utf-8") as f:
+        assert json.load(f)["journal_seq"] == 1
+
+
+def test_stale_journal_left_by_a_crash_is_not_replayed(database, data_file, conversation):
+    user_id, conv_id = conversation
+    database.increment_unread(user_id, conv_id, 3)
+    with open(database.journal_file, "rb") as f:
+        journal = f.read()
+    database.append_message(user_id, conv_id, "Bia", "oi")
+
+    # Crash between writing the data file and truncating the journal
+    with open(database.journal_file, "wb") as f:
+        f.write(journal)
+
+    reloaded = SimpleDatabase(data_file)
+    assert reloaded.get_unread_total(user_id) == 4
+    reloaded.increment_unread(user_id, conv_id)
+    assert journal_lines(reloaded)[-1]["seq"] == 2
+    assert SimpleDatabase(data_file).get_unread_total(user_id) == 5
+
+
+def test_torn_journal_line_does_not_swallow_the_next_entry(database, data_file, conversation):
+    user_id, conv_id = conversation
+    with open(database.journal_file, "ab") as f:
+        f.write(b'{"seq": 9, "user_id"')
+    database.increment_unread(user_id, conv_id)
+
+    assert SimpleDatabase(data_file).get_unread_total(user_id) == 1
+
+
+def test_journal_is_compacted_after_the_configured_entries(database, data_file, conversation, monkeypatch):
+    monkeypatch.setattr(database_module, "JOURNAL_COMPACT_ENTRIES", 3)
+    user_id, conv_id = conversation
+    for _ in range(3):
+        database.increment_unread(user_id, conv_id)
+
+    assert journal_lines(database) == []
+    assert stored_unread(data_file) == [3]
+
+
+def test_full_rewrite_keeps_read_state(database, conversation):
+    user_id, conv_id = conversation
+    stale = database.get_user_conversations(user_id)[0]
+    database.increment_unread(user_id, conv_id, 2)
+
+    stale.name = "Beatriz"
+    database.update_conversation(user_id, stale)
+
+    conv = database.get_user_conversations(user_id)[0]
+    assert (conv.name, conv.unread) == ("Beatriz", 2)
+    assert database.get_unread_total(user_id) == 2
+
+
+@pytest.mark.skipif(not MULTIPROCESS_SUPPORTED, reason="requires flock")
+def test_other_process_applies_only_the_journal_tail(data_file):
+    writer = SimpleDatabase(data_file, DataFileCoordinator(data_file))
+    user = writer.create_user(User(name="Ana", username="ana", password="x"))
+    conv = writer.add_conversation(user.id, Conversation(instance_id="i", name="Bia"))
+
+    reader = SimpleDatabase(data_file, DataFileCoordinator(data_file))
+    assert reader.get_unread_total(user.id) == 0
+    generation = reader.generation
+
+    writer.increment_unread(user.id, conv.id, 2)
+    writer.mark_conversation_read(user.id, conv.id)
+    writer.increment_unread(user.id, conv.id)
+
+    assert reader.get_unread_total(user.id) == 1
+    assert reader.query_conversations(user.id, unread=True)[0][0].id == conv.id
+    assert reader.generation == generation
+
+    reader.increment_unread(user.id, conv.id)
+    assert writer.get_unread_total(user.id) == 2
+    assert [entry["seq"] for entry in journal_lines(writer)] == [1, 2, 3, 4]
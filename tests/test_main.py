@@ -0,0 +1,26 @@
+import pytest
+
+import main
+from backend.coordination import MULTIPROCESS_SUPPORTED
+
+needs_flock = pytest.mark.skipif(not MULTIPROCESS_SUPPORTED, reason="requires flock")
+
+
+@pytest.fixture(autouse=True)
+def four_cores(monkeypatch):
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 4)
+
+
+@needs_flock
+def test_zero_workers_means_one_per_core():
+    assert main.resolve_workers(0) == 4
+
+
+@needs_flock
+def test_explicit_worker_count_is_kept():
+    assert main.resolve_workers(3) == 3
+
+
+def test_dev_mode_runs_a_single_worker():
+    assert main.resolve_workers(4, dev_mode=True) == 1
+    assert main.resolve_workers(0, dev_mode=True) == 1
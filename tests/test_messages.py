@@ -0,0 +1,80 @@
+import json
+import pickle
+import time
+from datetime import datetime
+
+import pytest
+
+from backend.messages import MessageStore, _legacy_timestamp, format_time
+from backend.serialization import encode_payload
+
+RECORDS = [
+    {"from_user": "me", "text": "Olá", "time": "10:00", "status": "sent", "timestamp": 1700000000.0},
+    {"from_user": "Bia", "text": "Oi! 👋", "time": "10:01", "status": "read", "timestamp": 1700000060.5},
+    {"from_user": "me", "text": "Tudo bem?", "time": "10:02", "status": "queued", "timestamp": 1700000120.0},
+]
+
+
+def expected(records):
+    return [{**record, "time": format_time(record["timestamp"])} for record in records]
+
+
+@pytest.fixture
+def store():
+    return MessageStore.from_records(RECORDS)
+
+
+def test_json_round_trip(store):
+    decoded = json.loads(encode_payload({"messages": store}))["messages"]
+
+    assert decoded == expected(RECORDS)
+    assert MessageStore.from_records(decoded).to_list() == expected(RECORDS)
+
+
+def test_pickle_round_trip_keeps_sender_lookup(store):
+    restored = pickle.loads(pickle.dumps(store, protocol=pickle.HIGHEST_PROTOCOL))
+    restored.append("Bia", "De novo", 1700000180.0)
+
+    assert restored.to_list()[:3] == expected(RECORDS)
+    assert restored._senders == ["me", "Bia"]
+    assert restored.to_list()[-1]["from_user"] == "Bia"
+
+
+@pytest.mark.parametrize("args", [
+    (5, "texto", 1.0),
+    ("me", 123, 1.0),
+    ("me", "texto", "ontem"),
+    ("me", "texto", 1.0, None),
+])
+def test_invalid_append_leaves_columns_aligned(store, args):
+    with pytest.raises((TypeError, ValueError)):
+        store.append(*args)
+
+    store.append("Bia", "Depois", 1700000180.0)
+    assert len(store) == 4
+    assert store.to_list()[:3] == expected(RECORDS)
+    assert store.to_list()[-1]["text"] == "Depois"
+
+
+@pytest.fixture
+def sao_paulo(monkeypatch):
+    monkeypatch.setenv("TZ", "America/Sao_Paulo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_legacy_time_is_local_on_the_local_day_of_updated_at(sao_paulo):
+    # 01:30 UTC on Jan 2nd is 22:30 on Jan 1st in São Paulo (UTC-3)
+    timestamp = _legacy_timestamp("22:15", datetime(2024, 1, 2, 1, 30))
+
+    assert datetime.utcfromtimestamp(timestamp) == datetime(2024, 1, 2, 1, 15)
+    assert format_time(timestamp) == "22:15"
+
+
+def test_legacy_time_after_updated_at_is_from_the_day_before(sao_paulo):
+    # 03:10 UTC is 00:10 local; a message shown at 23:50 was sent the previous evening
+    timestamp = _legacy_timestamp("23:50", datetime(2024, 1, 2, 3, 10))
+
+    assert datetime.utcfromtimestamp(timestamp) == datetime(2024, 1, 2, 2, 50)
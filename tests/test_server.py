@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from backend.instrumentation import RequestProfilingMiddleware
+from backend.models import Conversation, User
+
+
+def test_bad_cursor_is_a_client_error(client, database):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+
+    response = client.get(f"/api/users/{user.id}/conversations", params={"limit": 1, "cursor": "garbage"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_unknown_user_conversations_are_empty(client):
+    response = client.get("/api/users/nobody/conversations", params={"limit": 10})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_invalid_message_is_rejected_without_being_stored(client, database):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    conv = database.add_conversation(user.id, Conversation(instance_id="i", name="Bia"))
+    url = f"/api/users/{user.id}/conversations/{conv.id}/messages"
+
+    assert client.post(url, json={"text": 123}).status_code == 422
+    assert client.post(url, json={"from_user": "Bia"}).status_code == 422
+
+    response = client.get(f"/api/users/{user.id}/conversations")
+    assert response.status_code == 200
+    assert response.json()[0]["messages"] == []
+
+
+def test_message_from_contact_counts_as_unread(client, database):
+    user = database.create_user(User(name="Ana", username="ana", password="x"))
+    conv = database.add_conversation(user.id, Conversation(instance_id="i", name="Bia"))
+    url = f"/api/users/{user.id}/conversations/{conv.id}/messages"
+
+    assert client.post(url, json={"text": "oi"}).status_code == 200
+    assert client.post(url, json={"text": "olá", "from_user": "Bia"}).status_code == 200
+
+    stored = database.get_user_conversations(user.id)[0]
+    assert [(m.from_user, m.text) for m in stored.messages] == [("me", "oi"), ("Bia", "olá")]
+    assert stored.unread == 1
+
+
+def test_sort_accepts_exactly_one_minus_prefix(client):
+    assert client.get("/api/users", params={"sort": "-name"}).status_code == 200
+    response = client.get("/api/users", params={"sort": "--name"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cannot sort by '-name'"
+
+
+ADMIN_TOKEN = "s3cret"
+
+
+def profiling_middleware(app):
+    if app.middleware_stack is None:
+        app.middleware_stack = app.build_middleware_stack()
+    layer = app.middleware_stack
+    while not isinstance(layer, RequestProfilingMiddleware):
+        layer = layer.app
+    return layer
+
+
+@pytest.fixture
+def admin(client, monkeypatch):
+    from backend import server
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", ADMIN_TOKEN)
+    monkeypatch.setattr(profiling_middleware(client.app), "admin_token", ADMIN_TOKEN)
+    server.slow_requests.clear()
+    client.headers["X-Admin-Token"] = ADMIN_TOKEN
+    return server
+
+
+def test_admin_routes_are_hidden_without_a_configured_token(client, monkeypatch):
+    from backend import server
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    response = client.get("/api/admin/slow-requests", headers={"X-Admin-Token": "anything"})
+    assert response.status_code == 404
+
+
+def test_admin_routes_reject_a_wrong_token(admin, client):
+    assert client.get("/api/admin/slow-requests", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/slow-requests").status_code == 200
+
+
+def test_non_ascii_admin_token_is_rejected_not_an_error(admin, client):
+    token = "tökén".encode("utf-8")
+
+    traced = client.get("/api/users", headers={"X-Trace": "1", "X-Admin-Token": token})
+    assert traced.status_code == 200
+    assert "server-timing" not in traced.headers
+    assert client.get("/api/admin/slow-requests", headers={"X-Admin-Token": token}).status_code == 403
+
+
+def test_server_timing_needs_a_valid_token(admin, client):
+    def body(username):
+        return {"name": "Ana", "username": username, "password": "x"}
+
+    assert "server-timing" not in client.post("/api/users", json=body("a")).headers
+    assert "server-timing" not in client.post(
+        "/api/users", json=body("b"), headers={"X-Trace": "1", "X-Admin-Token": "wrong"}
+    ).headers
+
+    response = client.post("/api/users", json=body("c"), headers={"X-Trace": "1"})
+    assert response.status_code == 200
+    spans = {item.split(";")[0] for item in response.headers["server-timing"].split(", ")}
+    assert {"db.create_user", "db.encode", "db.commit", "handler", "serialize", "total"} <= spans
+
+
+def test_slow_requests_are_logged(admin, client, monkeypatch):
+    monkeypatch.setattr(profiling_middleware(client.app), "slow_threshold", 1e-9)
+    client.get("/api/users")
+
+    logged = client.get("/api/admin/slow-requests").json()["requests"]
+    assert [(entry["method"], entry["path"], entry["status"]) for entry in logged][0] == ("GET", "/api/users", 200)
+
+
+def test_only_one_profile_runs_at_a_time(admin, client):
+    first = threading.Thread(target=client.post, args=("/api/admin/profile",), kwargs={"params": {"seconds": 0.5}})
+    first.start()
+    try:
+        for _ in range(100):
+            if admin.profiler.busy:
+                break
+            time.sleep(0.01)
+        assert admin.profiler.busy
+        assert client.post("/api/admin/profile", params={"seconds": 0.1}).status_code == 409
+    finally:
+        first.join()
+    response = client.post("/api/admin/profile", params={"seconds": 0.05})
+    assert response.status_code == 200